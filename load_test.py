@@ -2,156 +2,997 @@
 Load Testing Script for CS6650 Homework 10
 Tests checkout flow: Create Cart -> Add Item -> Checkout
 Sends 200k checkout messages to the Application Load Balancer
+
+Engines:
+  threads - ThreadPoolExecutor + requests (default)
+  async   - single event loop + aiohttp (pip install aiohttp)
+            runs on uvloop when installed (pip install uvloop)
+  raw     - ThreadPoolExecutor + keep-alive sockets, responses parsed
+            with httptools (pip install httptools)
+
+Result counts are aggregated with numpy when it is installed.
 """
 
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
 import threading
+import itertools
 import time
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from collections import defaultdict
+import array
+import math
+import multiprocessing
+import os
+import queue
+import re
+import socket
+import ssl
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 import sys
 
+try:
+    import aiohttp
+    import aiohttp.abc
+except ImportError:
+    aiohttp = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import httptools
+except ImportError:
+    httptools = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Configuration
 DEFAULT_ALB_URL = "http://cs6650-hw10-alb-1645005431.us-west-2.elb.amazonaws.com"
 DEFAULT_TOTAL_REQUESTS = 200000
 DEFAULT_THREAD_COUNTS = [10, 20, 50, 100, 200]
+ENGINES = ['threads', 'async', 'raw']
+
+# Auto-tuner: coarse concurrency probes, then refinement around the fitted peak
+AUTO_TUNE_PROBES = [10, 50, 200]
+DEFAULT_PROBE_REQUESTS = 20000
+
+# Pre-encoded request bodies: the card number is constant and product ids
+# cycle through 1000 values, so none of them need json.dumps per request
+JSON_HEADERS = {'Content-Type': 'application/json'}
+CHECKOUT_BODY = json.dumps({"credit_card_number": "1234-5678-9012-3456"}).encode()
+ITEM_BODIES = [
+    json.dumps({"product_id": f"PROD-{i}", "quantity": 1}).encode()
+    for i in range(1000)
+]
+CART_BODY_TEMPLATE = b'{"customer_id": "CUST-%d"}'
+# Only cart_id is needed from the create-cart response, so it is pulled out
+# of the raw bytes rather than decoding the whole JSON document
+CART_ID_RE = re.compile(rb'"cart_id"\s*:\s*"([^"]+)"')
+
+# Raw engine request frame: path, Host, Content-Length, Cookie line, body
+RAW_REQUEST_TEMPLATE = (
+    b"POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+    b"Content-Length: %d\r\n%s\r\n%s"
+)
+BULK_BODY_TEMPLATE = (
+    b'{"customer_id": "CUST-%d", "product_id": "PROD-%d", "quantity": 1, '
+    b'"credit_card_number": "1234-5678-9012-3456"}'
+)
+
+# Result codes: each checkout ends in exactly one of these, and workers
+# count them in a fixed-size array indexed by code (slot 0 = success)
+OK = 0
+ERR_PAYMENT_DECLINED = 1
+ERR_TIMEOUT = 2
+ERR_CONNECTION = 3
+ERR_CART_ID_MISSING = 4
+ERR_EXCEPTION = 5
+ERROR_NAMES = ['success', 'payment_declined', 'timeout', 'connection_error',
+               'cart_id_missing', 'exception']
+
+# Unexpected HTTP statuses get one slot per (step, status); slot 0 of a
+# step catches anything outside 1-599
+STEP_CART_CREATION = 0
+STEP_ADD_ITEM = 1
+STEP_CHECKOUT = 2
+STEP_NAMES = ['cart_creation', 'add_item', 'checkout']
+STATUS_SLOTS = 600
+ERR_STATUS_BASE = len(ERROR_NAMES)
+NUM_RESULT_CODES = ERR_STATUS_BASE + len(STEP_NAMES) * STATUS_SLOTS
+
+# Fail fast: a load test should count errors, not hide them behind retries
+NO_RETRIES = Retry(total=0, read=False, redirect=False)
+
+# Per-thread HTTP client (connection + sticky-session cookies)
+_thread_local = threading.local()
 
 # Global statistics
-stats_lock = threading.Lock()
+# Counters live in one array per worker (thread or event loop) and are only
+# summed at the end of a run, so completions never contend on a shared lock.
+# The lock only guards registration of a new worker's counters.
+worker_stats_lock = threading.Lock()
+worker_stats = []
+# Run timestamps are integer nanoseconds from time.monotonic_ns(): immune to
+# wall-clock adjustments and converted to seconds only when reporting
 stats = {
-    'total_requests': 0,
-    'successful': 0,
-    'failed': 0,
-    'payment_declined': 0,
-    'errors': defaultdict(int),
-    'start_time': None,
-    'end_time': None
+    'start_ns': None,
+    'end_ns': None
 }
 
 
-def checkout_flow(alb_url, request_id):
+def status_error(step, status):
+    """Result code for an unexpected HTTP status at a given step"""
+    return ERR_STATUS_BASE + step * STATUS_SLOTS + (status if 0 < status < STATUS_SLOTS else 0)
+
+
+def checkout_result(status):
+    """Result code for the final checkout response of a flow"""
+    if status == 200:
+        return OK
+    elif status == 402:
+        return ERR_PAYMENT_DECLINED
+    return status_error(STEP_CHECKOUT, status)
+
+
+def error_name(code):
+    """Human-readable name for a result code (report time only)"""
+    if code < ERR_STATUS_BASE:
+        return ERROR_NAMES[code]
+    step, status = divmod(code - ERR_STATUS_BASE, STATUS_SLOTS)
+    return f"{STEP_NAMES[step]}_{status if status else 'other'}"
+
+
+def resolve_alb(alb_url):
     """
-    Single checkout flow: create cart -> add item -> checkout
-    Uses Session to maintain cookies for sticky sessions
-    Returns: (success: bool, error_type: str)
+    Resolve the ALB host once, so workers can connect to a fixed address
+    instead of calling getaddrinfo for every new connection
+    Returns: [(family, ip), ...] in resolver order, without duplicates
+    """
+    parts = urlsplit(alb_url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    addresses = []
+    for family, _, _, _, sockaddr in socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM):
+        if (family, sockaddr[0]) not in addresses:
+            addresses.append((family, sockaddr[0]))
+    return addresses
+
+
+class StickyCookieJar(RequestsCookieJar):
+    """
+    Cookie jar that skips cookielib's policy and expiry parsing.
+    The only cookie that matters is the ALB's opaque sticky-session token,
+    so the name=value part of each Set-Cookie is copied verbatim into the
+    owning Session's Cookie header and nothing is stored in the jar. The
+    header only ever holds the current cart's token: the flows pop it before
+    creating the next cart.
+    """
+    
+    def __init__(self, headers):
+        super().__init__()
+        self._headers = headers
+    
+    def extract_cookies(self, response, request):
+        values = response.info().get_all('Set-Cookie')
+        if values:
+            self._headers['Cookie'] = '; '.join(v.split(';', 1)[0].strip() for v in values)
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose responses skip the per-response cookie jar.
+    Same as HTTPAdapter.build_response minus extract_cookies_to_jar; the
+    Session's StickyCookieJar already picks up Set-Cookie.
+    """
+    
+    # Copied from requests 2.34.2 HTTPAdapter.build_response with the
+    # extract_cookies_to_jar call removed; re-check against it on upgrades.
+    def build_response(self, req, resp):
+        response = Response()
+        response.status_code = getattr(resp, 'status', None)
+        response.headers = CaseInsensitiveDict(getattr(resp, 'headers', {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = resp
+        response.reason = resp.reason
+        response.url = req.url.decode('utf-8') if isinstance(req.url, bytes) else req.url
+        response.request = req
+        response.connection = self
+        return response
+
+
+class PinnedIPAdapter(KeepAliveAdapter):
+    """
+    Adapter that connects to a pre-resolved IP instead of resolving the
+    URL's host. Only a copy of each request is rewritten (Host header kept),
+    so the Session still sees the real hostname.
+    """
+    
+    def __init__(self, dest_ip, **kwargs):
+        self.dest_ip = dest_ip
+        super().__init__(**kwargs)
+    
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        ip = f"[{self.dest_ip}]" if ':' in self.dest_ip else self.dest_ip
+        netloc = f"{ip}:{parts.port}" if parts.port else ip
+        pinned = request.copy()
+        pinned.url = parts._replace(netloc=netloc).geturl()
+        pinned.headers['Host'] = parts.netloc
+        return super().send(pinned, **kwargs)
+
+
+def parse_cart_id(body):
+    """Extract cart_id from a create-cart response body (None if absent)"""
+    match = CART_ID_RE.search(body)
+    return match.group(1).decode() if match else None
+
+
+def make_session(dest_ip=None, pool_size=1):
+    """
+    Create a keep-alive Session with a pooled adapter, no retries and a
+    StickyCookieJar.
+    Connections are reused across checkouts instead of re-handshaking each time.
+    One Session per worker thread only ever needs a single connection.
+    With dest_ip, plain-HTTP connections go to that address without DNS.
     """
-    # Use Session to maintain cookies (for sticky sessions)
     session = requests.Session()
+    session.trust_env = False
+    session.headers['Connection'] = 'keep-alive'
+    session.headers.update(JSON_HEADERS)
+    session.cookies = StickyCookieJar(session.headers)
+    adapter = KeepAliveAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                               max_retries=NO_RETRIES)
+    session.mount('https://', adapter)
+    if dest_ip is not None:
+        adapter = PinnedIPAdapter(dest_ip, pool_connections=pool_size, pool_maxsize=pool_size,
+                                  max_retries=NO_RETRIES)
+    session.mount('http://', adapter)
+    return session
+
+
+class StaleConnection(ConnectionError):
+    """A kept-alive socket was closed by the server before it answered"""
+
+
+class RawConnection:
+    """
+    Minimal keep-alive HTTP/1.1 client for the raw engine.
+    Requests are formatted from a bytes template and written straight to the
+    socket; responses go through httptools' C parser. Set-Cookie values are
+    echoed back verbatim on later requests instead of going through a cookie
+    jar, which is all the ALB sticky session needs; the flows reset
+    cookie_line before each new cart so carts are not pinned to one instance.
+    """
+    
+    def __init__(self, host, port, use_tls=False, dest_ip=None, timeout=30):
+        self.host = host
+        self.port = port
+        self.dest_ip = dest_ip
+        self.use_tls = use_tls
+        self.timeout = timeout
+        if port in (80, 443):
+            self.host_header = host.encode()
+        else:
+            self.host_header = b"%s:%d" % (host.encode(), port)
+        self.sock = None
+        self.parser = None
+        self.cookie_line = b""
+        self.status = 0
+        self.body = []
+        self.cookies = []
+        self.complete = False
+    
+    # httptools parser callbacks
+    def on_header(self, name, value):
+        if name.lower() == b"set-cookie":
+            self.cookies.append(value.split(b";", 1)[0])
+    
+    def on_body(self, body):
+        self.body.append(body)
+    
+    def on_message_complete(self):
+        self.complete = True
+    
+    def connect(self):
+        sock = socket.create_connection((self.dest_ip or self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.use_tls:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        self.sock = sock
+        self.parser = httptools.HttpResponseParser(self)
+    
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+    
+    def post(self, path, body):
+        """
+        Send one POST and return (status, body bytes).
+        Reconnects once if a reused socket turns out to be closed.
+        """
+        if self.sock is not None:
+            try:
+                return self._exchange(path, body)
+            except StaleConnection:
+                pass
+        self.connect()
+        return self._exchange(path, body)
     
+    def _exchange(self, path, body):
+        self.body = []
+        self.cookies = []
+        self.complete = False
+        request = RAW_REQUEST_TEMPLATE % (path, self.host_header, len(body), self.cookie_line, body)
+        
+        received = False
+        try:
+            self.sock.sendall(request)
+            while not self.complete:
+                data = self.sock.recv(65536)
+                if not data:
+                    raise ConnectionResetError("connection closed by server")
+                received = True
+                self.parser.feed_data(data)
+        except (ConnectionResetError, BrokenPipeError) as e:
+            self.close()
+            if not received:
+                raise StaleConnection(str(e)) from e
+            raise
+        except Exception:
+            self.close()
+            raise
+        
+        status = self.parser.get_status_code()
+        if not self.parser.should_keep_alive():
+            self.close()
+        if self.cookies:
+            self.cookie_line = b"Cookie: %s\r\n" % b"; ".join(self.cookies)
+        return status, b"".join(self.body)
+
+
+if aiohttp is not None:
+    class PinnedResolver(aiohttp.abc.AbstractResolver):
+        """
+        aiohttp resolver that answers from addresses resolved at startup.
+        The connector's DNS cache rotates through them for new connections.
+        """
+        
+        def __init__(self, addresses):
+            self.addresses = addresses
+        
+        async def resolve(self, host, port=0, family=socket.AF_INET):
+            return [
+                {'hostname': host, 'host': ip, 'port': port, 'family': ip_family,
+                 'proto': 0, 'flags': socket.AI_NUMERICHOST}
+                for ip_family, ip in self.addresses
+            ]
+        
+        async def close(self):
+            pass
+
+
+def checkout_flow(session, carts_url, request_id):
+    """
+    Single checkout flow: create cart -> add item -> checkout
+    Uses the worker thread's Session so cookies (sticky sessions) and
+    connections are shared by the three steps; the sticky cookie is dropped
+    before each new cart so carts still spread across instances
+    Returns: result code (OK or ERR_*)
+    """
+    # New cart, new instance: don't carry the previous cart's AWSALB cookie
+    # (the pooled connection is kept)
+    session.headers.pop('Cookie', None)
     try:
         # Step 1: Create shopping cart
         cart_resp = session.post(
-            f"{alb_url}/shopping-carts",
-            json={"customer_id": f"CUST-{request_id}"},
+            carts_url,
+            data=CART_BODY_TEMPLATE % request_id,
             timeout=30
         )
         
         if cart_resp.status_code != 201:
-            return False, f"cart_creation_{cart_resp.status_code}"
+            return status_error(STEP_CART_CREATION, cart_resp.status_code)
         
-        cart_data = cart_resp.json()
-        cart_id = cart_data.get("cart_id")
+        cart_id = parse_cart_id(cart_resp.content)
         if not cart_id:
-            return False, "cart_id_missing"
+            return ERR_CART_ID_MISSING
         
         # Step 2: Add item to cart (same session = same cookie = same instance)
         add_item_resp = session.post(
-            f"{alb_url}/shopping-carts/{cart_id}/items",
-            json={"product_id": f"PROD-{request_id % 1000}", "quantity": 1},
+            f"{carts_url}/{cart_id}/items",
+            data=ITEM_BODIES[request_id % 1000],
             timeout=30
         )
         
         if add_item_resp.status_code != 200:
-            return False, f"add_item_{add_item_resp.status_code}"
+            return status_error(STEP_ADD_ITEM, add_item_resp.status_code)
         
         # Step 3: Checkout (same session = same cookie = same instance)
         checkout_resp = session.post(
-            f"{alb_url}/shopping-carts/{cart_id}/checkout",
-            json={"credit_card_number": "1234-5678-9012-3456"},
+            f"{carts_url}/{cart_id}/checkout",
+            data=CHECKOUT_BODY,
             timeout=30
         )
         
-        if checkout_resp.status_code == 200:
-            return True, "success"
-        elif checkout_resp.status_code == 402:
-            return False, "payment_declined"
-        else:
-            return False, f"checkout_{checkout_resp.status_code}"
+        return checkout_result(checkout_resp.status_code)
             
     except requests.exceptions.Timeout:
-        return False, "timeout"
+        return ERR_TIMEOUT
     except requests.exceptions.ConnectionError:
-        return False, "connection_error"
-    except Exception as e:
-        return False, f"exception_{type(e).__name__}"
-    finally:
-        session.close()
+        return ERR_CONNECTION
+    except Exception:
+        return ERR_EXCEPTION
+
+
+def bulk_checkout_flow(session, bulk_url, request_id):
+    """
+    Bulk checkout flow: one POST /shopping-carts/checkout that creates the
+    cart, adds the item and checks out server-side (1 round trip instead of 3)
+    Returns: result code (OK or ERR_*)
+    """
+    session.headers.pop('Cookie', None)
+    try:
+        checkout_resp = session.post(
+            bulk_url,
+            data=BULK_BODY_TEMPLATE % (request_id, request_id % 1000),
+            timeout=30
+        )
+        
+        return checkout_result(checkout_resp.status_code)
+            
+    except requests.exceptions.Timeout:
+        return ERR_TIMEOUT
+    except requests.exceptions.ConnectionError:
+        return ERR_CONNECTION
+    except Exception:
+        return ERR_EXCEPTION
+
+
+def raw_checkout_flow(conn, carts_path, request_id):
+    """
+    Raw-socket checkout flow: create cart -> add item -> checkout
+    All three steps share the worker thread's connection and cookie; the
+    previous cart's sticky cookie is dropped first
+    Returns: result code (OK or ERR_*)
+    """
+    # New cart, new instance: don't carry the previous cart's AWSALB cookie
+    conn.cookie_line = b""
+    try:
+        # Step 1: Create shopping cart
+        status, body = conn.post(carts_path, CART_BODY_TEMPLATE % request_id)
+        if status != 201:
+            return status_error(STEP_CART_CREATION, status)
+        
+        cart_id = parse_cart_id(body)
+        if not cart_id:
+            return ERR_CART_ID_MISSING
+        cart_path = b"%s/%s" % (carts_path, cart_id.encode())
+        
+        # Step 2: Add item to cart (same connection + cookie = same instance)
+        status, _ = conn.post(cart_path + b"/items", ITEM_BODIES[request_id % 1000])
+        if status != 200:
+            return status_error(STEP_ADD_ITEM, status)
+        
+        # Step 3: Checkout (same connection + cookie = same instance)
+        status, _ = conn.post(cart_path + b"/checkout", CHECKOUT_BODY)
+        return checkout_result(status)
+            
+    except socket.timeout:
+        return ERR_TIMEOUT
+    except OSError:
+        return ERR_CONNECTION
+    except Exception:
+        return ERR_EXCEPTION
+
+
+def raw_bulk_checkout_flow(conn, bulk_path, request_id):
+    """
+    Raw-socket bulk checkout flow: one POST /shopping-carts/checkout
+    Returns: result code (OK or ERR_*)
+    """
+    conn.cookie_line = b""
+    try:
+        status, _ = conn.post(bulk_path, BULK_BODY_TEMPLATE % (request_id, request_id % 1000))
+        return checkout_result(status)
+            
+    except socket.timeout:
+        return ERR_TIMEOUT
+    except OSError:
+        return ERR_CONNECTION
+    except Exception:
+        return ERR_EXCEPTION
+
+
+async def checkout_flow_async(session, carts_url, request_id):
+    """
+    Async checkout flow: create cart -> add item -> checkout
+    The shared ClientSession has no cookie jar, so the sticky-session cookie
+    from cart creation is carried by hand to keep one cart on one instance
+    Returns: result code (OK or ERR_*)
+    """
+    try:
+        # Step 1: Create shopping cart
+        async with session.post(
+            carts_url,
+            data=CART_BODY_TEMPLATE % request_id
+        ) as cart_resp:
+            if cart_resp.status != 201:
+                await cart_resp.read()
+                return status_error(STEP_CART_CREATION, cart_resp.status)
+            cart_id = parse_cart_id(await cart_resp.read())
+            cookie = "; ".join(f"{m.key}={m.value}" for m in cart_resp.cookies.values())
+        
+        if not cart_id:
+            return ERR_CART_ID_MISSING
+        headers = {"Cookie": cookie} if cookie else None
+        
+        # Step 2: Add item to cart (same cookie = same instance)
+        async with session.post(
+            f"{carts_url}/{cart_id}/items",
+            data=ITEM_BODIES[request_id % 1000],
+            headers=headers
+        ) as add_item_resp:
+            await add_item_resp.read()
+            if add_item_resp.status != 200:
+                return status_error(STEP_ADD_ITEM, add_item_resp.status)
+        
+        # Step 3: Checkout (same cookie = same instance)
+        async with session.post(
+            f"{carts_url}/{cart_id}/checkout",
+            data=CHECKOUT_BODY,
+            headers=headers
+        ) as checkout_resp:
+            await checkout_resp.read()
+            status = checkout_resp.status
+        
+        return checkout_result(status)
+            
+    except asyncio.TimeoutError:
+        return ERR_TIMEOUT
+    except aiohttp.ClientConnectionError:
+        return ERR_CONNECTION
+    except Exception:
+        return ERR_EXCEPTION
+
+
+async def bulk_checkout_flow_async(session, bulk_url, request_id):
+    """
+    Async bulk checkout flow: one POST /shopping-carts/checkout
+    Returns: result code (OK or ERR_*)
+    """
+    try:
+        async with session.post(
+            bulk_url,
+            data=BULK_BODY_TEMPLATE % (request_id, request_id % 1000)
+        ) as checkout_resp:
+            await checkout_resp.read()
+            status = checkout_resp.status
+        
+        return checkout_result(status)
+            
+    except asyncio.TimeoutError:
+        return ERR_TIMEOUT
+    except aiohttp.ClientConnectionError:
+        return ERR_CONNECTION
+    except Exception:
+        return ERR_EXCEPTION
 
 
-def worker_thread(alb_url, request_id):
+class LifoWorkQueue(queue.LifoQueue):
+    """
+    LIFO work queue for ThreadPoolExecutor.
+    The executor's shutdown sentinel (None) is pushed to the bottom so every
+    queued work item still runs before workers see it and exit.
+    """
+    
+    def _put(self, item):
+        if item is None:
+            self.queue.insert(0, item)
+        else:
+            self.queue.append(item)
+
+
+class LifoThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that hands out the most recently submitted work first.
+    Threads are still created lazily, only when no idle worker is available.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._work_queue = LifoWorkQueue()
+
+
+def new_worker_stats():
+    """Create and register a private result-code counter array for one worker"""
+    counts = array.array('Q', bytes(8 * NUM_RESULT_CODES))
+    with worker_stats_lock:
+        worker_stats.append(counts)
+    return counts
+
+
+def init_worker_thread(make_client):
+    """ThreadPoolExecutor initializer: give each pool thread its own client and counters"""
+    _thread_local.client = make_client()
+    _thread_local.stats = new_worker_stats()
+
+
+def sum_counts(count_arrays):
+    """
+    Element-wise sum of per-worker result-code counts.
+    With numpy the arrays are stacked into one (workers, codes) matrix and
+    reduced in a single pass; otherwise they are added up in Python.
+    """
+    if np is not None:
+        if not count_arrays:
+            return np.zeros(NUM_RESULT_CODES, dtype=np.uint64)
+        return np.stack([np.asarray(a, dtype=np.uint64) for a in count_arrays]).sum(axis=0)
+    
+    counts = [0] * NUM_RESULT_CODES
+    for worker_counts in count_arrays:
+        for code, count in enumerate(worker_counts):
+            counts[code] += count
+    return counts
+
+
+def collect_counts():
+    """Sum every worker's counters into one count per result code"""
+    with worker_stats_lock:
+        return sum_counts(worker_stats)
+
+
+def summarize_counts(counts):
+    """Turn per-result-code counts into run totals (errors sorted by count)"""
+    if np is not None:
+        counts = np.asarray(counts, dtype=np.uint64)
+        order = np.argsort(counts, kind='stable')[::-1]
+        order = order[(counts[order] > 0) & (order != OK)]
+        errors = [(error_name(int(code)), int(counts[code])) for code in order]
+        total = int(counts.sum())
+    else:
+        errors = sorted(((error_name(code), count) for code, count in enumerate(counts)
+                         if code != OK and count), key=lambda x: x[1], reverse=True)
+        total = sum(counts)
+    
+    successful = int(counts[OK])
+    return {
+        'successful': successful,
+        'failed': total - successful,
+        'payment_declined': int(counts[ERR_PAYMENT_DECLINED]),
+        'errors': errors
+    }
+
+
+def worker_thread(flow, url, request_id):
     """Worker function for a single request"""
-    success, error_type = checkout_flow(alb_url, request_id)
+    code = flow(_thread_local.client, url, request_id)
+    _thread_local.stats[code] += 1
+    return code == OK
+
+
+def warm_session(session, warm_url):
+    """Open the Session's connection with one cheap request (status ignored)"""
+    try:
+        session.get(warm_url, timeout=30)
+    except requests.exceptions.RequestException:
+        pass
+
+
+def warm_raw_connection(conn):
+    """Open the raw connection's socket ahead of the first checkout"""
+    try:
+        if conn.sock is None:
+            conn.connect()
+    except OSError:
+        pass
+
+
+async def warm_async(session, warm_url):
+    """Open one pooled aiohttp connection with a cheap request (status ignored)"""
+    try:
+        async with session.get(warm_url) as resp:
+            await resp.read()
+    except (asyncio.TimeoutError, aiohttp.ClientError):
+        pass
+
+
+def thread_engine_setup(alb_url, engine, bulk, addresses=None):
+    """
+    Pick the per-thread client factory, warm-up function, flow function and
+    target for a threaded engine. With pre-resolved addresses, each new
+    thread's client is pinned to the next one round-robin, so all ALB nodes
+    still get load.
+    Returns: (make_client, warm, flow, url)
+    """
+    parts = urlsplit(alb_url)
+    use_tls = parts.scheme == 'https'
+    # Pinning is plain-HTTP only: TLS needs the hostname for SNI/certificates
+    if addresses and not use_tls:
+        next_ip = itertools.cycle([ip for _, ip in addresses]).__next__
+    else:
+        next_ip = lambda: None
+    
+    if engine == 'raw':
+        port = parts.port or (443 if use_tls else 80)
+        make_client = lambda: RawConnection(parts.hostname, port, use_tls, next_ip())
+        carts_path = parts.path.rstrip('/').encode() + b"/shopping-carts"
+        if bulk:
+            return make_client, warm_raw_connection, raw_bulk_checkout_flow, carts_path + b"/checkout"
+        return make_client, warm_raw_connection, raw_checkout_flow, carts_path
+    
+    make_client = lambda: make_session(next_ip())
+    warm = lambda session: warm_session(session, f"{alb_url}/")
+    if bulk:
+        return make_client, warm, bulk_checkout_flow, f"{alb_url}/shopping-carts/checkout"
+    return make_client, warm, checkout_flow, f"{alb_url}/shopping-carts"
+
+
+class ProgressReporter:
+    """
+    Background thread that prints progress once per interval.
+    Engines only store their completed count into a slot of `slots` (one
+    slot per load-generator process); the reporter sums them, so the hot
+    path never reads the clock or touches stdout.
+    """
+    
+    def __init__(self, total_requests, slots, interval=1.0):
+        self.total_requests = total_requests
+        self.slots = slots
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            completed = sum(self.slots)
+            elapsed = (time.monotonic_ns() - stats['start_ns']) / 1e9
+            rate = completed / elapsed if elapsed > 0 else 0
+            print(f"  Progress: {completed}/{self.total_requests} ({rate:.0f} req/s)",
+                  end='\r', flush=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def run_threads(alb_url, num_threads, request_ids, bulk=False, engine='threads', progress=None,
+                addresses=None, progress_slot=0, ready=None):
+    """
+    Drive the checkout flow for request_ids from a pool of num_threads threads
+    The completed count is stored in progress[progress_slot] when given
+    ready() is called once every thread's connection is warm, right before
+    the measured work starts
+    """
+    # next() on itertools.count is atomic under the GIL, so completion
+    # callbacks can share it without a lock
+    completions = itertools.count(1)
+    make_client, warm, flow, url = thread_engine_setup(alb_url, engine, bulk, addresses)
+    # Each warm-up task waits at the barrier until num_threads of them are
+    # running, which makes the pool start all of its threads up front
+    warm_barrier = threading.Barrier(num_threads)
+    
+    def warm_thread():
+        warm_barrier.wait()
+        warm(_thread_local.client)
+    # Bound queued work to a small multiple of the pool size so the driver
+    # never holds more than a few Futures per thread at once
+    in_flight = threading.BoundedSemaphore(num_threads * 4)
     
-    with stats_lock:
-        stats['total_requests'] += 1
-        if success:
-            stats['successful'] += 1
+    def on_done(future):
+        in_flight.release()
+        completed = next(completions)
+        if progress is not None:
+            progress[progress_slot] = completed
+    
+    # Exiting the with-block shuts the pool down and waits for it to drain
+    with LifoThreadPoolExecutor(max_workers=num_threads, initializer=init_worker_thread,
+                                initargs=(make_client,)) as executor:
+        warm_ups = [executor.submit(warm_thread) for _ in range(num_threads)]
+        for future in warm_ups:
+            future.result()
+        if ready is not None:
+            ready()
+        
+        for i in request_ids:
+            in_flight.acquire()
+            executor.submit(worker_thread, flow, url, i).add_done_callback(on_done)
+
+
+async def run_async(alb_url, concurrency, request_ids, bulk=False, progress=None,
+                    addresses=None, progress_slot=0, ready=None):
+    """
+    Drive the checkout flow for request_ids from one event loop with
+    `concurrency` flows in flight.
+    The completed count is stored in progress[progress_slot] when given
+    ready() is called once `concurrency` pooled connections are open
+    A fixed set of worker coroutines pulls request ids from a shared iterator,
+    which bounds concurrency like a semaphore without creating a task per request.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=concurrency,
+        ttl_dns_cache=300,
+        enable_cleanup_closed=True,
+        resolver=PinnedResolver(addresses) if addresses else None
+    )
+    request_ids = iter(request_ids)
+    if bulk:
+        flow, url = bulk_checkout_flow_async, f"{alb_url}/shopping-carts/checkout"
+    else:
+        flow, url = checkout_flow_async, f"{alb_url}/shopping-carts"
+    # Single-threaded event loop: one set of counters shared by all coroutines
+    counts = new_worker_stats()
+    completed = 0
+    
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=30),
+        headers=JSON_HEADERS,
+        cookie_jar=aiohttp.DummyCookieJar()
+    ) as session:
+        async def worker():
+            nonlocal completed
+            for request_id in request_ids:
+                counts[await flow(session, url, request_id)] += 1
+                completed += 1
+                if progress is not None:
+                    progress[progress_slot] = completed
+        
+        # Concurrent warm-up requests each need their own connection, which
+        # leaves `concurrency` idle connections in the pool
+        await asyncio.gather(*(warm_async(session, f"{alb_url}/") for _ in range(concurrency)))
+        if ready is not None:
+            ready()
+        
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def run_engine(alb_url, num_threads, request_ids, engine, bulk, progress=None, addresses=None,
+               progress_slot=0, ready=None):
+    """Run one engine over request_ids in the current process"""
+    if engine == 'async':
+        # libuv-backed loop: fewer syscalls and less per-connection overhead
+        loop_factory = uvloop.new_event_loop if uvloop is not None else None
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(run_async(alb_url, num_threads, request_ids, bulk, progress, addresses,
+                                 progress_slot, ready))
+    else:
+        run_threads(alb_url, num_threads, request_ids, bulk, engine, progress, addresses,
+                    progress_slot, ready)
+
+
+def run_slice(conn, alb_url, num_threads, request_ids, engine, bulk, addresses, progress, slot,
+              warm_barrier):
+    """Load-generator process: run one slice of the test and send back its counts"""
+    with worker_stats_lock:
+        worker_stats.clear()
+    run_engine(alb_url, num_threads, request_ids, engine, bulk, progress, addresses, slot,
+               warm_barrier.wait)
+    conn.send(collect_counts())
+    conn.close()
+
+
+def run_processes(alb_url, num_threads, total_requests, engine, bulk, num_processes, addresses=None,
+                  progress=None, ready=None):
+    """
+    Split the run across num_processes load-generator processes so response
+    parsing is not serialized on one GIL. Requests and threads are divided
+    evenly, so num_threads remains the total concurrency.
+    progress is a shared array with one completed-count slot per process.
+    ready() is called once every process has warmed its connections.
+    Returns: per-result-code counts summed over all processes
+    """
+    # Every process plus this one meet here after warm-up, so the clock
+    # starts only when all connections are open
+    warm_barrier = multiprocessing.Barrier(num_processes + 1)
+    workers = []
+    for i in range(num_processes):
+        request_ids = range(total_requests * i // num_processes,
+                            total_requests * (i + 1) // num_processes)
+        threads = num_threads * (i + 1) // num_processes - num_threads * i // num_processes
+        # Rotate the address list so processes don't all start on the same node
+        if addresses:
+            offset = i % len(addresses)
+            slice_addresses = addresses[offset:] + addresses[:offset]
         else:
-            stats['failed'] += 1
-            if error_type == "payment_declined":
-                stats['payment_declined'] += 1
-            stats['errors'][error_type] += 1
+            slice_addresses = addresses
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=run_slice,
+            args=(writer, alb_url, threads, request_ids, engine, bulk, slice_addresses, progress, i,
+                  warm_barrier),
+            daemon=True
+        )
+        process.start()
+        writer.close()
+        workers.append((process, reader))
+    
+    try:
+        warm_barrier.wait(timeout=120)
+    except threading.BrokenBarrierError:
+        raise RuntimeError("Load processes did not finish warming up")
+    if ready is not None:
+        ready()
     
-    return success
+    slice_counts = []
+    for i, (process, reader) in enumerate(workers):
+        try:
+            slice_counts.append(reader.recv())
+        except EOFError:
+            raise RuntimeError(f"Load process {i} exited without reporting results")
+        process.join()
+    return sum_counts(slice_counts)
 
 
-def run_load_test(alb_url, num_threads, total_requests, test_name=""):
+def run_load_test(alb_url, num_threads, total_requests, test_name="", engine="threads", bulk=False,
+                  processes=1, addresses=None):
     """
     Run load test with specified number of threads
+    (or concurrent flows, for the async engine)
+    bulk=True sends each checkout as a single bulk request
+    processes > 1 spreads the threads over that many load-generator processes
+    addresses (from resolve_alb) pins connections to pre-resolved ALB IPs
     Returns: (throughput: float, success_rate: float, duration: float)
     """
     print(f"\n{'='*60}")
     print(f"Load Test: {test_name}")
-    print(f"Threads: {num_threads}, Total Requests: {total_requests}")
+    processes = max(1, min(processes, num_threads))
+    print(f"Threads: {num_threads}, Total Requests: {total_requests}, Engine: {engine}, "
+          f"Processes: {processes}")
     print(f"{'='*60}")
     
     # Reset stats
-    with stats_lock:
-        stats['total_requests'] = 0
-        stats['successful'] = 0
-        stats['failed'] = 0
-        stats['payment_declined'] = 0
-        stats['errors'].clear()
-        stats['start_time'] = time.time()
+    with worker_stats_lock:
+        worker_stats.clear()
     
     # Run load test
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        futures = [
-            executor.submit(worker_thread, alb_url, i)
-            for i in range(total_requests)
-        ]
-        
-        # Wait for completion with progress updates
-        completed = 0
-        last_update = time.time()
-        for future in as_completed(futures):
-            completed += 1
-            if completed % 10000 == 0 or time.time() - last_update > 5:
-                elapsed = time.time() - stats['start_time']
-                rate = completed / elapsed if elapsed > 0 else 0
-                print(f"  Progress: {completed}/{total_requests} ({rate:.0f} req/s)", end='\r')
-                last_update = time.time()
-    
-    stats['end_time'] = time.time()
-    duration = stats['end_time'] - stats['start_time']
+    if processes > 1:
+        progress = multiprocessing.RawArray('Q', processes)
+    else:
+        progress = [0]
+    reporter = ProgressReporter(total_requests, progress)
+    
+    def start_clock():
+        # Connections are warm: measurement starts here
+        stats['start_ns'] = time.monotonic_ns()
+        reporter.start()
+    
+    try:
+        if processes > 1:
+            counts = run_processes(alb_url, num_threads, total_requests, engine, bulk, processes,
+                                   addresses, progress, start_clock)
+        else:
+            run_engine(alb_url, num_threads, range(total_requests), engine, bulk, progress,
+                       addresses, ready=start_clock)
+            counts = collect_counts()
+    finally:
+        reporter.stop()
+    
+    stats['end_ns'] = time.monotonic_ns()
+    duration = (stats['end_ns'] - stats['start_ns']) / 1e9
     
     # Calculate metrics
-    with stats_lock:
-        successful = stats['successful']
-        failed = stats['failed']
-        payment_declined = stats['payment_declined']
+    totals = summarize_counts(counts)
+    successful = totals['successful']
+    failed = totals['failed']
+    payment_declined = totals['payment_declined']
     
     throughput = successful / duration if duration > 0 else 0
     success_rate = (successful / total_requests * 100) if total_requests > 0 else 0
@@ -164,14 +1005,81 @@ def run_load_test(alb_url, num_threads, total_requests, test_name=""):
     print(f"  Payment Declined: {payment_declined} (expected ~10%)")
     print(f"  Throughput: {throughput:.2f} successful requests/second")
     
-    if stats['errors']:
+    if totals['errors']:
         print(f"  Error breakdown:")
-        for error_type, count in sorted(stats['errors'].items(), key=lambda x: x[1], reverse=True):
+        for error_type, count in totals['errors']:
             print(f"    {error_type}: {count}")
     
     return throughput, success_rate, duration
 
 
+def concave_peak(points):
+    """
+    Fit y = a*x^2 + b*x + c exactly through three (x, y) points
+    Returns: x at the vertex if the parabola opens downward, else None
+    """
+    (x0, y0), (x1, y1), (x2, y2) = points
+    denom = (x0 - x1) * (x0 - x2) * (x1 - x2)
+    if denom == 0:
+        return None
+    a = (x2 * (y1 - y0) + x1 * (y0 - y2) + x0 * (y2 - y1)) / denom
+    b = (x2 ** 2 * (y0 - y1) + x1 ** 2 * (y2 - y0) + x0 ** 2 * (y1 - y2)) / denom
+    if a >= 0:
+        return None
+    return -b / (2 * a)
+
+
+def find_optimal_concurrency(alb_url, probe_requests=DEFAULT_PROBE_REQUESTS, engine="threads",
+                             bulk=False, processes=1, addresses=None, pause=10):
+    """
+    Find the throughput knee with short probe runs instead of a full sweep.
+    Probes AUTO_TUNE_PROBES, fits a concave curve of throughput against
+    log(concurrency), then probes the fitted peak and the midpoints between
+    it and its probed neighbours.
+    Returns: list of result dicts (one per probe), sorted by thread count
+    """
+    results = {}
+    
+    def probe(concurrency):
+        if concurrency in results:
+            return
+        if results:
+            print(f"\nWaiting {pause} seconds before next probe...")
+            time.sleep(pause)
+        throughput, success_rate, duration = run_load_test(
+            alb_url, concurrency, probe_requests, f"Probe: {concurrency} threads",
+            engine, bulk, processes, addresses
+        )
+        results[concurrency] = {
+            'threads': concurrency,
+            'throughput': throughput,
+            'success_rate': success_rate,
+            'duration': duration
+        }
+    
+    for concurrency in AUTO_TUNE_PROBES:
+        probe(concurrency)
+    
+    # Throughput vs concurrency is roughly concave in log space; fall back to
+    # the best coarse probe when the fit isn't
+    lowest, highest = AUTO_TUNE_PROBES[0], AUTO_TUNE_PROBES[-1]
+    peak = concave_peak([(math.log(c), results[c]['throughput']) for c in AUTO_TUNE_PROBES])
+    if peak is not None:
+        center = min(max(round(math.exp(peak)), lowest), highest)
+    else:
+        center = max(results.values(), key=lambda x: x['throughput'])['threads']
+    print(f"\nFitted peak: {center} threads")
+    
+    probe(center)
+    lower = max((c for c in results if c < center), default=None)
+    upper = min((c for c in results if c > center), default=None)
+    for neighbour in (lower, upper):
+        if neighbour is not None:
+            probe(round(math.sqrt(center * neighbour)))
+    
+    return sorted(results.values(), key=lambda x: x['threads'])
+
+
 def main():
     parser = argparse.ArgumentParser(description='Load test for microservices checkout flow')
     parser.add_argument('--alb-url', default=DEFAULT_ALB_URL,
@@ -182,35 +1090,75 @@ def main():
                        help=f'Thread counts to test (default: {DEFAULT_THREAD_COUNTS})')
     parser.add_argument('--single', type=int, metavar='N',
                        help='Run single test with N threads (overrides --threads)')
+    parser.add_argument('--auto-tune', action='store_true',
+                       help='Search for the best thread count with short probes (overrides --threads)')
+    parser.add_argument('--probe-requests', type=int, default=DEFAULT_PROBE_REQUESTS,
+                       help=f'Requests per auto-tune probe (default: {DEFAULT_PROBE_REQUESTS})')
     parser.add_argument('--warmup', type=int, default=100,
                        help='Warmup requests before main test (default: 100)')
+    parser.add_argument('--engine', choices=ENGINES, default='threads',
+                       help='Client engine: threads (requests), async (aiohttp) or raw '
+                            '(sockets + httptools) (default: threads)')
+    parser.add_argument('--processes', type=int, default=1,
+                       help='Load-generator processes to split each test across, 0 = one per CPU '
+                            '(default: 1)')
+    parser.add_argument('--no-pin-dns', action='store_true',
+                       help='Resolve the ALB per connection instead of pinning addresses resolved at startup')
+    parser.add_argument('--bulk', action='store_true',
+                       help='Send each checkout as one POST /shopping-carts/checkout instead of 3 calls')
     
     args = parser.parse_args()
     
+    if args.engine == 'async' and aiohttp is None:
+        parser.error("--engine async requires aiohttp (pip install aiohttp)")
+    if args.engine == 'raw' and httptools is None:
+        parser.error("--engine raw requires httptools (pip install httptools)")
+    
+    if args.processes == 0:
+        args.processes = os.cpu_count() or 1
+    
     print("="*60)
     print("CS6650 Homework 10 - Load Testing")
     print("="*60)
     print(f"ALB URL: {args.alb_url}")
     print(f"Total Requests: {args.total}")
+    print(f"Engine: {args.engine}")
+    print(f"Flow: {'bulk (1 request)' if args.bulk else '3 requests'}")
+    if args.engine == 'async':
+        print(f"Event loop: {'uvloop' if uvloop is not None else 'asyncio'}")
+    
+    addresses = None
+    if not args.no_pin_dns:
+        addresses = resolve_alb(args.alb_url)
+        print(f"ALB addresses: {', '.join(ip for _, ip in addresses)}")
     
     # Warmup
     if args.warmup > 0:
         print(f"\nWarming up with {args.warmup} requests...")
-        run_load_test(args.alb_url, 10, args.warmup, "Warmup")
+        run_load_test(args.alb_url, 10, args.warmup, "Warmup", args.engine, args.bulk,
+                      args.processes, addresses)
         time.sleep(5)  # Brief pause after warmup
     
     # Determine thread counts to test
-    if args.single:
+    if args.auto_tune:
+        thread_counts = []
+    elif args.single:
         thread_counts = [args.single]
     else:
         thread_counts = args.threads
     
     # Run tests
     results = []
+    if args.auto_tune:
+        results = find_optimal_concurrency(
+            args.alb_url, args.probe_requests, args.engine, args.bulk,
+            args.processes, addresses
+        )
     for thread_count in thread_counts:
         test_name = f"{thread_count} threads"
         throughput, success_rate, duration = run_load_test(
-            args.alb_url, thread_count, args.total, test_name
+            args.alb_url, thread_count, args.total, test_name, args.engine, args.bulk,
+            args.processes, addresses
         )
         results.append({
             'threads': thread_count,
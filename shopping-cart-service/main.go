@@ -45,6 +45,14 @@ type CheckoutRequest struct {
 	CreditCardNumber string `json:"credit_card_number" binding:"required"`
 }
 
+// BulkCheckoutRequest for creating a cart, adding one item and checking out in one call
+type BulkCheckoutRequest struct {
+	CustomerID       string `json:"customer_id" binding:"required"`
+	ProductID        string `json:"product_id" binding:"required"`
+	Quantity         int    `json:"quantity" binding:"required,min=1,max=10000"`
+	CreditCardNumber string `json:"credit_card_number" binding:"required"`
+}
+
 // CCARequest for credit card authorization
 type CCARequest struct {
 	CreditCardNumber string  `json:"credit_card_number"`
@@ -95,6 +103,7 @@ func main() {
 
 	// Shopping cart endpoints
 	router.POST("/shopping-carts", createCart)
+	router.POST("/shopping-carts/checkout", bulkCheckout)
 	router.GET("/shopping-carts/:id", getCart)
 	router.POST("/shopping-carts/:id/items", addItemToCart)
 	router.POST("/shopping-carts/:id/checkout", checkout)
@@ -283,40 +292,73 @@ func checkout(c *gin.Context) {
 
 	log.Printf("Processing checkout for cart %s", cartID)
 
+	status, body := processCheckout(cart, req.CreditCardNumber)
+	if status == http.StatusOK {
+		// Clear the cart (checkout successful)
+		carts.Delete(cartID)
+	}
+
+	c.JSON(status, body)
+}
+
+// bulkCheckout creates a cart, adds one item and checks out in a single round trip
+func bulkCheckout(c *gin.Context) {
+	var req BulkCheckoutRequest
+	if err := c.ShouldBindJSON(&req); err != nil {
+		c.JSON(http.StatusBadRequest, gin.H{"error": "invalid request body"})
+		return
+	}
+
+	// The cart only lives for this request, so it is never stored
+	cart := ShoppingCart{
+		CartID:     uuid.New().String(),
+		CustomerID: req.CustomerID,
+		Items:      []CartItem{{ProductID: req.ProductID, Quantity: req.Quantity}},
+		CreatedAt:  time.Now(),
+	}
+
+	log.Printf("Processing bulk checkout for cart %s", cart.CartID)
+
+	status, body := processCheckout(cart, req.CreditCardNumber)
+	body["cart_id"] = cart.CartID
+	c.JSON(status, body)
+}
+
+// processCheckout authorizes payment for a cart and sends the order to the warehouse
+// Returns the HTTP status and response body for the checkout
+func processCheckout(cart ShoppingCart, creditCardNumber string) (int, gin.H) {
 	// Step 1: Authorize payment with Credit Card Authorizer
 	amount := calculateTotal(cart.Items)
 	ccaReq := CCARequest{
-		CreditCardNumber: req.CreditCardNumber,
+		CreditCardNumber: creditCardNumber,
 		Amount:           amount,
 	}
 
 	ccaResp, err := authorizePayment(ccaReq)
 	if err != nil {
 		log.Printf("CCA authorization failed: %v", err)
-		c.JSON(http.StatusInternalServerError, gin.H{
+		return http.StatusInternalServerError, gin.H{
 			"error":   "payment authorization failed",
 			"message": err.Error(),
-		})
-		return
+		}
 	}
 
 	// Check if payment was declined
 	if ccaResp.Status != "Authorized" {
-		log.Printf("Payment declined for cart %s", cartID)
-		c.JSON(http.StatusPaymentRequired, gin.H{
+		log.Printf("Payment declined for cart %s", cart.CartID)
+		return http.StatusPaymentRequired, gin.H{
 			"error":   "payment declined",
 			"message": ccaResp.Message,
-		})
-		return
+		}
 	}
 
-	log.Printf("✓ Payment authorized for cart %s", cartID)
+	log.Printf("✓ Payment authorized for cart %s", cart.CartID)
 
 	// Step 2: Send order to warehouse via RabbitMQ
 	orderID := uuid.New().String()
 	order := WarehouseOrder{
 		OrderID:    orderID,
-		CartID:     cartID,
+		CartID:     cart.CartID,
 		CustomerID: cart.CustomerID,
 		Items:      cart.Items,
 		Timestamp:  time.Now().Format(time.RFC3339),
@@ -324,26 +366,21 @@ func checkout(c *gin.Context) {
 
 	if err := publishToWarehouse(order); err != nil {
 		log.Printf("Failed to send order to warehouse: %v", err)
-		c.JSON(http.StatusInternalServerError, gin.H{
+		return http.StatusInternalServerError, gin.H{
 			"error":   "failed to send order to warehouse",
 			"message": err.Error(),
-		})
-		return
+		}
 	}
 
-	log.Printf("✓ Order %s sent to warehouse for cart %s", orderID, cartID)
+	log.Printf("✓ Order %s sent to warehouse for cart %s", orderID, cart.CartID)
 
-	// Step 3: Clear the cart (checkout successful)
-	carts.Delete(cartID)
-
-	// Return success response
-	c.JSON(http.StatusOK, gin.H{
+	return http.StatusOK, gin.H{
 		"message":              "checkout successful",
 		"order_id":             orderID,
 		"authorization_status": "Authorized",
 		"transaction_id":       ccaResp.TransactionID,
 		"total_amount":         amount,
-	})
+	}
 }
 
 // authorizePayment calls the Credit Card Authorizer service